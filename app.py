@@ -6,7 +6,9 @@ from werkzeug.security import generate_password_hash, check_password_hash
 
 # Import your SQLAlchemy instance and models
 # models.py must define: db (SQLAlchemy), User (with fields: email, password_hash, name, is_admin)
-from models import db, User  # type: ignore
+from models import db, User, ensure_schema, recompute_workload  # type: ignore
+from passwords import hasher, PasswordHasherBusy
+from sla import DEFAULT_SLA_HOURS, parse_sla_hours, recompute_due_dates
 
 # --- Small inline templates so it works even if Jinja files are missing ---
 LOGIN_HTML = """
@@ -64,8 +66,14 @@ def create_app() -> Flask:
         db_url = db_url.replace('postgres://', 'postgresql+psycopg2://', 1)
     app.config['SQLALCHEMY_DATABASE_URI'] = db_url or f"sqlite:///{os.path.join(BASE_DIR, 'tickets.db')}"
 
+    # --- Password hashing policy (e.g. "scrypt:16384:8:1", "pbkdf2:sha256:260000") ---
+    app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+    app.config['PASSWORD_HASH_QUEUE'] = int(os.getenv('PASSWORD_HASH_QUEUE', '16'))
+
     # --- Init extensions ---
     db.init_app(app)
+    hasher.init_app(app)
 
     login_manager = LoginManager()
     login_manager.login_view = 'login'
@@ -81,6 +89,11 @@ def create_app() -> Flask:
     # --- Create tables and ensure an admin exists ---
     with app.app_context():
         db.create_all()
+        added = ensure_schema()
+        if 'tickets.due_at' in added:
+            recompute_due_dates(parse_sla_hours(os.getenv('SLA_HOURS', DEFAULT_SLA_HOURS)))
+        if 'users.open_tickets_count' in added:
+            recompute_workload()
 
         admin_email = os.environ.get('ADMIN_EMAIL')
         admin_password = os.environ.get('ADMIN_PASSWORD')
@@ -91,14 +104,18 @@ def create_app() -> Flask:
             if not admin:
                 admin = User(name=admin_name, email=admin_email, is_admin=True)
                 # Prefer set_password if model provides it
-                if hasattr(admin, 'set_password'):
-                    admin.set_password(admin_password)  # type: ignore[attr-defined]
+                try:
+                    if hasattr(admin, 'set_password'):
+                        admin.set_password(admin_password)  # type: ignore[attr-defined]
+                    else:
+                        # Fallback: assign password_hash directly
+                        if hasattr(admin, 'password_hash'):
+                            admin.password_hash = generate_password_hash(admin_password)  # type: ignore[attr-defined]
+                except PasswordHasherBusy:
+                    app.logger.error(f"Admin seed skipped (password hasher busy): {admin_email}")
                 else:
-                    # Fallback: assign password_hash directly
-                    if hasattr(admin, 'password_hash'):
-                        admin.password_hash = generate_password_hash(admin_password)  # type: ignore[attr-defined]
-                db.session.add(admin)
-                db.session.commit()
+                    db.session.add(admin)
+                    db.session.commit()
 
     # --- Routes ---
     @app.route('/login', methods=['GET', 'POST'])
@@ -117,16 +134,25 @@ def create_app() -> Flask:
                 if hasattr(user, 'check_password'):
                     try:
                         ok = user.check_password(password)  # type: ignore[attr-defined]
+                    except PasswordHasherBusy:
+                        return render_template_string(LOGIN_HTML, msg='Troppi accessi in corso, riprova tra qualche secondo'), 503
                     except Exception:
                         ok = False
                 # Fallback if model doesn't expose check_password
-                if not ok and hasattr(user, 'password_hash'):
+                elif hasattr(user, 'password_hash'):
                     try:
                         ok = check_password_hash(user.password_hash, password)  # type: ignore[arg-type]
                     except Exception:
                         ok = False
 
             if ok and user:
+                # Bring the stored hash in line with the current policy (upgrade or downgrade)
+                if user.password_needs_rehash():
+                    try:
+                        user.set_password(password)
+                        db.session.commit()
+                    except PasswordHasherBusy:
+                        pass  # retried on the next login
                 login_user(user)
                 next_url = request.args.get('next') or url_for('home')
                 return redirect(next_url)
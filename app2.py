@@ -8,19 +8,40 @@ import csv
 
 from flask import (
     Flask, render_template, redirect, url_for, flash, request,
-    send_from_directory, current_app, send_file
+    send_from_directory, current_app, send_file, jsonify,
+    Response, stream_with_context
 )
 from flask_login import (
     LoginManager, login_user, login_required, logout_user, current_user
 )
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 
-from models import db, User, Ticket, TicketAction, TicketStatus
-from forms import LoginForm, RegisterForm, TicketForm, ActionForm
+from models import (
+    db, User, Ticket, TicketAction, TicketStatus, SlaLevel, NotificationOutbox, UploadSession,
+    ensure_schema, adjust_workload, recompute_workload
+)
+from passwords import hasher, PasswordHasherBusy
+from sla import sla, apply_sla, parse_sla_hours, recompute_due_dates
+from notifications import outbox, notify_assignment
+import chunked_uploads
+from chunked_uploads import UploadError
+from assets import assets
+from forms import LoginForm, RegisterForm, ImportUsersForm, TicketForm, ActionForm
+from provisioning import parse_users_csv, provision_users
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 
+# Codici usati da ActionForm.status <-> TicketStatus
+STATUS_FROM_FORM = {
+    'APERTO': TicketStatus.OPEN,
+    'IN_LAVORAZIONE': TicketStatus.IN_PROGRESS,
+    'CHIUSO': TicketStatus.CLOSED,
+}
+STATUS_TO_FORM = {v: k for k, v in STATUS_FROM_FORM.items()}
+
 
 def create_app():
     app = Flask(__name__)
@@ -29,6 +50,16 @@ def create_app():
     app.config['UPLOAD_FOLDER'] = os.path.join(BASE_DIR, 'uploads')
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+    # --- Upload: limite per singola richiesta (form e blocchi) e upload a blocchi per i file grandi ---
+    # Nessun limite di default: i form dei ticket caricano ancora l'allegato in un'unica richiesta
+    if os.getenv('MAX_CONTENT_LENGTH_MB'):
+        app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH_MB')) * 1024 * 1024
+    app.config['UPLOAD_MAX_SIZE'] = int(os.getenv('UPLOAD_MAX_SIZE_MB', '1024')) * 1024 * 1024
+    app.config['UPLOAD_CHUNK_SIZE'] = int(os.getenv('UPLOAD_CHUNK_SIZE_MB', '8')) * 1024 * 1024
+    app.config['UPLOAD_SESSION_TTL_HOURS'] = int(os.getenv('UPLOAD_SESSION_TTL_HOURS', '24'))
+    app.config['UPLOAD_TMP_FOLDER'] = os.path.join(BASE_DIR, 'uploads_tmp')
+    os.makedirs(app.config['UPLOAD_TMP_FOLDER'], exist_ok=True)
+
     # --- Database: PostgreSQL su Render, SQLite in locale ---
     db_url = os.getenv('DATABASE_URL')
     if db_url and db_url.startswith("postgres://"):
@@ -37,24 +68,68 @@ def create_app():
         db_url or 'sqlite:///' + os.path.join(BASE_DIR, 'tickets.db')
     )
 
+    # --- Hashing password: metodo/costo configurabili (es. "scrypt:16384:8:1", "pbkdf2:sha256:260000") ---
+    app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+    app.config['PASSWORD_HASH_QUEUE'] = int(os.getenv('PASSWORD_HASH_QUEUE', '16'))
+    # Import da web: pochi utenti, hash nel thread della richiesta. Per i grandi volumi usare import_users.py
+    app.config['IMPORT_USERS_WEB_MAX_ROWS'] = int(os.getenv('IMPORT_USERS_WEB_MAX_ROWS', '50'))
+
+    # --- SLA: ore per priorità (es. "CRITICA=4,ALTA=8") e scheduler di escalation ---
+    app.config['SLA_HOURS'] = os.getenv('SLA_HOURS', 'CRITICA=4,ALTA=8')
+    app.config['SLA_WARN_MINUTES'] = int(os.getenv('SLA_WARN_MINUTES', '60'))
+    app.config['SLA_SCAN_INTERVAL'] = int(os.getenv('SLA_SCAN_INTERVAL', '60'))
+    app.config['SLA_BATCH_SIZE'] = int(os.getenv('SLA_BATCH_SIZE', '200'))
+    app.config['SLA_SCHEDULER'] = os.getenv('SLA_SCHEDULER', '1').lower() in {'1', 'true', 'yes', 'on'}
+
+    # --- Notifiche email (outbox): il worker parte solo se SMTP_HOST è impostato ---
+    app.config['SMTP_HOST'] = os.getenv('SMTP_HOST')
+    app.config['SMTP_PORT'] = int(os.getenv('SMTP_PORT', '25'))
+    app.config['SMTP_USER'] = os.getenv('SMTP_USER')
+    app.config['SMTP_PASSWORD'] = os.getenv('SMTP_PASSWORD')
+    app.config['SMTP_STARTTLS'] = os.getenv('SMTP_STARTTLS', '0').lower() in {'1', 'true', 'yes', 'on'}
+    app.config['MAIL_FROM'] = os.getenv('MAIL_FROM', 'ticketing@localhost')
+    app.config['APP_BASE_URL'] = os.getenv('APP_BASE_URL', '')
+    app.config['NOTIFY_INTERVAL'] = int(os.getenv('NOTIFY_INTERVAL', '30'))
+    app.config['NOTIFY_BATCH_SIZE'] = int(os.getenv('NOTIFY_BATCH_SIZE', '200'))
+    app.config['NOTIFY_MAX_ATTEMPTS'] = int(os.getenv('NOTIFY_MAX_ATTEMPTS', '5'))
+    app.config['NOTIFY_BACKOFF_SECONDS'] = int(os.getenv('NOTIFY_BACKOFF_SECONDS', '60'))
+    app.config['NOTIFY_RETENTION_DAYS'] = int(os.getenv('NOTIFY_RETENTION_DAYS', '30'))
+
+    # --- Static con fingerprint/cache lunga e gzip per HTML, CSV e JSON sopra la soglia ---
+    app.config['COMPRESS_MIN_SIZE'] = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+
     # Inizializza estensioni
     db.init_app(app)
+    hasher.init_app(app)
+    assets.init_app(app)
 
     # Crea tabelle se non esistono e seed opzionale admin
     with app.app_context():
         db.create_all()
-
-         # CREA UN ADMIN SOLO SE NON ESISTONO UTENTI
-    if User.query.count() == 0:
-        admin_name = os.getenv("ADMIN_NAME", "Admin")
-        admin_email = os.getenv("ADMIN_EMAIL", "admin@example.com")
-        admin_password = os.getenv("ADMIN_PASSWORD", "changeme")
-
-        u = User(name=admin_name, email=admin_email, is_admin=True)
-        u.set_password(admin_password)
-        db.session.add(u)
-        db.session.commit()
-        app.logger.info(f"Created initial admin: {admin_email}")
+        added = ensure_schema()
+        # Scadenze SLA appena aggiunte: calcolale per i ticket già aperti
+        if 'tickets.due_at' in added:
+            recompute_due_dates(parse_sla_hours(app.config['SLA_HOURS']))
+        # Colonne dei contatori appena aggiunte: popolale una volta dai ticket esistenti
+        if 'users.open_tickets_count' in added:
+            recompute_workload()
+
+        # CREA UN ADMIN SOLO SE NON ESISTONO UTENTI
+        if User.query.count() == 0:
+            admin_name = os.getenv("ADMIN_NAME", "Admin")
+            admin_email = os.getenv("ADMIN_EMAIL", "admin@example.com")
+            admin_password = os.getenv("ADMIN_PASSWORD", "changeme")
+
+            u = User(name=admin_name, email=admin_email.lower(), is_admin=True)
+            try:
+                u.set_password(admin_password)
+            except PasswordHasherBusy:
+                app.logger.error(f"Initial admin not created (password hasher busy): {admin_email}")
+            else:
+                db.session.add(u)
+                db.session.commit()
+                app.logger.info(f"Created initial admin: {admin_email}")
 
         # Seed amministratore opzionale (usa variabili ENV se presenti)
         admin_email = os.getenv('ADMIN_EMAIL')
@@ -67,9 +142,16 @@ def create_app():
                     email=admin_email.lower(),
                     is_admin=True
                 )
-                admin.password_hash = generate_password_hash(admin_password)
-                db.session.add(admin)
-                db.session.commit()
+                try:
+                    admin.set_password(admin_password)
+                except PasswordHasherBusy:
+                    app.logger.error(f"Admin seed skipped (password hasher busy): {admin_email}")
+                else:
+                    db.session.add(admin)
+                    db.session.commit()
+
+    sla.init_app(app)
+    outbox.init_app(app)
 
     login_manager = LoginManager()
     login_manager.login_view = 'login'
@@ -88,13 +170,24 @@ def create_app():
         progress_count = db.session.query(Ticket.id).filter(Ticket.status == TicketStatus.IN_PROGRESS).count()
         closed_count = db.session.query(Ticket.id).filter(Ticket.status == TicketStatus.CLOSED).count()
         recent = db.session.query(Ticket).order_by(Ticket.updated_at.desc()).limit(10).all()
+        # Solo ticket già segnalati dallo scheduler: lettura sull'indice (sla_level, due_at)
+        sla_items = (
+            db.session.query(Ticket)
+            .filter(Ticket.sla_level.in_([int(SlaLevel.DUE_SOON), int(SlaLevel.BREACHED)]))
+            .filter(Ticket.due_at.isnot(None))
+            .order_by(Ticket.sla_level.desc(), Ticket.due_at)
+            .limit(20)
+            .all()
+        )
         return render_template(
             'dashboard.html',
             total=total or 0,
             open_count=open_count or 0,
             progress_count=progress_count or 0,
             closed_count=closed_count or 0,
-            recent=recent
+            recent=recent,
+            sla_items=sla_items,
+            SlaLevel=SlaLevel
         )
 
     # --------------------- AUTH ---------------------
@@ -105,7 +198,19 @@ def create_app():
         form = LoginForm()
         if form.validate_on_submit():
             user = db.session.query(User).filter_by(email=form.email.data.lower()).first()
-            if user and check_password_hash(user.password_hash, form.password.data):
+            try:
+                ok = user is not None and user.check_password(form.password.data)
+            except PasswordHasherBusy:
+                flash('Troppi accessi in corso, riprova tra qualche secondo.', 'warning')
+                return render_template('login.html', form=form), 503
+            if ok:
+                # Allinea l'hash alla policy corrente (upgrade o downgrade del costo)
+                if user.password_needs_rehash():
+                    try:
+                        user.set_password(form.password.data)
+                        db.session.commit()
+                    except PasswordHasherBusy:
+                        pass  # si riprova al prossimo login
                 login_user(user, remember=True)
                 return redirect(url_for('index'))
             flash('Email o password non validi', 'danger')
@@ -133,13 +238,75 @@ def create_app():
                 email=form.email.data.lower(),
                 is_admin=form.is_admin.data
             )
-            user.password_hash = generate_password_hash(form.password.data)
+            try:
+                user.set_password(form.password.data)
+            except PasswordHasherBusy:
+                flash('Server occupato, riprova tra qualche secondo.', 'warning')
+                return render_template('register.html', form=form), 503
             db.session.add(user)
             db.session.commit()
             flash('Utente creato con successo.', 'success')
             return redirect(url_for('users'))
         return render_template('register.html', form=form)
 
+    @app.route('/users/import', methods=['GET', 'POST'])
+    @login_required
+    def import_users():
+        if not current_user.is_admin:
+            flash('Solo gli admin possono importare utenti.', 'warning')
+            return redirect(url_for('index'))
+        form = ImportUsersForm()
+        if form.validate_on_submit():
+            text = form.csv_file.data.read().decode('utf-8-sig', errors='replace')
+            rows, errors = parse_users_csv(text)
+            for err in errors[:10]:
+                flash(err, 'warning')
+            if len(errors) > 10:
+                flash(f"... e altre {len(errors) - 10} righe scartate.", 'warning')
+
+            max_rows = current_app.config['IMPORT_USERS_WEB_MAX_ROWS']
+            if len(rows) > max_rows:
+                flash(
+                    f"Il file contiene {len(rows)} utenti: dal web se ne possono importare al massimo {max_rows}. "
+                    "Per import più grandi usare lo script import_users.py sul server.",
+                    'danger'
+                )
+                return redirect(url_for('import_users'))
+
+            try:
+                count, generated, skipped = provision_users(rows, parallel=False)
+            except PasswordHasherBusy:
+                db.session.rollback()
+                flash('Server occupato, riprova tra qualche secondo.', 'warning')
+                return redirect(url_for('import_users'))
+            except IntegrityError:
+                # Email registrata tra il controllo e l'inserimento: l'import è annullato per intero
+                db.session.rollback()
+                flash(
+                    "Uno degli utenti è stato creato nel frattempo da un'altra operazione: nessun utente importato. "
+                    "Ripetere l'import, gli utenti già esistenti verranno saltati.",
+                    'warning'
+                )
+                return redirect(url_for('import_users'))
+            if skipped:
+                flash(f"{len(skipped)} utenti già esistenti sono stati saltati.", 'warning')
+            flash(f"Utenti creati: {count}.", 'success')
+
+            # Le password generate si consegnano come CSV: sarebbero troppe per un flash
+            if generated:
+                sio = StringIO()
+                writer = csv.writer(sio, delimiter=';')
+                writer.writerow(["Email", "Password"])
+                writer.writerows(generated)
+                bio = BytesIO(sio.getvalue().encode('utf-8-sig'))
+                return send_file(
+                    bio, as_attachment=True,
+                    download_name="credenziali_utenti.csv",
+                    mimetype="text/csv"
+                )
+            return redirect(url_for('users'))
+        return render_template('import_users.html', form=form)
+
     # --------------------- USERS ---------------------
     @app.route('/users')
     @login_required
@@ -172,6 +339,13 @@ def create_app():
             flash('Impossibile eliminare l’utente: è collegato a uno o più ticket.', 'warning')
             return redirect(url_for('users'))
 
+        # Notifiche ancora in coda o già inviate: senza ticket collegati non servono più
+        db.session.query(NotificationOutbox).filter(
+            NotificationOutbox.recipient_id == user.id
+        ).delete(synchronize_session=False)
+        # Upload a blocchi non finalizzati, con i relativi file temporanei
+        for session in db.session.query(UploadSession).filter(UploadSession.user_id == user.id):
+            chunked_uploads.discard(current_app.config, session)
         db.session.delete(user)
         db.session.commit()
         flash(f"Utente {user.name} eliminato con successo.", 'success')
@@ -194,7 +368,11 @@ def create_app():
             alphabet = string.ascii_letters + string.digits
             new_password = ''.join(secrets.choice(alphabet) for _ in range(10))
 
-        user.password_hash = generate_password_hash(new_password)
+        try:
+            user.set_password(new_password)
+        except PasswordHasherBusy:
+            flash('Server occupato, riprova tra qualche secondo.', 'warning')
+            return users(), 503
         db.session.commit()
         flash(f"Password aggiornata per {user.name}. Nuova password: {new_password}", 'success')
         return redirect(url_for('users'))
@@ -214,6 +392,24 @@ def create_app():
         items = q.all()
         return render_template('tickets_list.html', items=items, status=status)
 
+    @app.route('/my-tickets')
+    @login_required
+    def my_tickets():
+        status = request.args.get('status', 'active')
+        # Letture sull'indice (assigned_to_id, status, updated_at)
+        q = db.session.query(Ticket).filter(Ticket.assigned_to_id == current_user.id)
+        if status == 'open':
+            q = q.filter(Ticket.status == TicketStatus.OPEN)
+        elif status == 'in_progress':
+            q = q.filter(Ticket.status == TicketStatus.IN_PROGRESS)
+        elif status == 'closed':
+            q = q.filter(Ticket.status == TicketStatus.CLOSED)
+        else:
+            status = 'active'
+            q = q.filter(Ticket.status.in_([TicketStatus.OPEN, TicketStatus.IN_PROGRESS]))
+        items = q.order_by(Ticket.updated_at.desc()).limit(200).all()
+        return render_template('my_tickets.html', items=items, status=status)
+
     # --------- EXPORT: Excel (default) o CSV via ?format=csv ---------
     @app.route('/tickets/export')
     @login_required
@@ -237,33 +433,48 @@ def create_app():
         else:
             status = 'all'
 
-        tickets = q.all()
+        # Creatore caricato nella stessa query; righe lette dal DB a blocchi di 500
+        q = q.options(joinedload(Ticket.created_by))
 
         header = ["Titolo del ticket", "Descrizione del ticket", "Nome utente (creatore)", "Stato", "Data di creazione"]
-        rows = []
-        for t in tickets:
-            rows.append([
-                t.title,
-                t.description,
-                t.created_by.name if t.created_by else "",
-                t.status.value,
-                t.created_at.strftime("%d/%m/%Y %H:%M"),
-            ])
+
+        def iter_rows():
+            for t in q.yield_per(500):
+                yield [
+                    t.title,
+                    t.description,
+                    t.created_by.name if t.created_by else "",
+                    t.status.value,
+                    t.created_at.strftime("%d/%m/%Y %H:%M"),
+                ]
 
         if out_format == 'csv':
-            sio = StringIO()
-            writer = csv.writer(sio, delimiter=';')
-            writer.writerow(header)
-            writer.writerows(rows)
-            data = sio.getvalue().encode('utf-8-sig')
-            bio = BytesIO(data)
-            return send_file(
-                bio, as_attachment=True,
-                download_name=f"{filename_map.get(status, 'tickets')}.csv",
-                mimetype="text/csv"
+            # Streaming: la query gira dentro il generatore, la memoria non cresce con la tabella
+            # (compresso al volo da assets se il client accetta gzip)
+            def generate():
+                sio = StringIO()
+                writer = csv.writer(sio, delimiter=';')
+                sio.write('\ufeff')
+                writer.writerow(header)
+                for row in iter_rows():
+                    writer.writerow(row)
+                    if sio.tell() >= 64 * 1024:
+                        yield sio.getvalue()
+                        sio.seek(0)
+                        sio.truncate()
+                yield sio.getvalue()
+
+            return Response(
+                stream_with_context(generate()),
+                mimetype="text/csv",
+                headers={
+                    'Content-Disposition':
+                        f"attachment; filename={filename_map.get(status, 'tickets')}.csv"
+                }
             )
 
-        # Excel con openpyxl (fallback a CSV se non disponibile)
+        # Excel con openpyxl (fallback a CSV se non disponibile): il workbook è comunque in memoria
+        rows = list(iter_rows())
         try:
             from openpyxl import Workbook
             wb = Workbook()
@@ -314,10 +525,13 @@ def create_app():
                 priority=form.priority.data,
                 created_by_id=current_user.id,
                 assigned_to_id=form.assigned_to.data if form.assigned_to.data else None,
-                attachment=filename
+                attachment=filename,
+                created_at=datetime.utcnow()
             )
+            apply_sla(t, sla.targets)
             db.session.add(t)
             db.session.flush()
+            adjust_workload(None, None, t.assigned_to_id, t.status)
             action = TicketAction(
                 ticket_id=t.id,
                 user_id=current_user.id,
@@ -325,6 +539,7 @@ def create_app():
                 notes='Ticket creato'
             )
             db.session.add(action)
+            notify_assignment(t, None, t.assigned_to_id, current_user)
             db.session.commit()
             flash('Ticket creato.', 'success')
             return redirect(url_for('ticket_detail', ticket_id=t.id))
@@ -333,7 +548,18 @@ def create_app():
     @app.route('/tickets/<int:ticket_id>', methods=['GET', 'POST'])
     @login_required
     def ticket_detail(ticket_id):
-        t = db.session.get(Ticket, ticket_id)
+        if request.method == 'POST':
+            # Riga bloccata fino al commit: stato/assegnatario letti qui sono quelli che
+            # adjust_workload sposta, due POST concorrenti non possono partire dagli stessi valori
+            t = (
+                db.session.query(Ticket)
+                .filter(Ticket.id == ticket_id)
+                .with_for_update()
+                .populate_existing()
+                .first()
+            )
+        else:
+            t = db.session.get(Ticket, ticket_id)
         if not t:
             flash('Ticket non trovato.', 'danger')
             return redirect(url_for('tickets'))
@@ -344,20 +570,19 @@ def create_app():
         ]
 
         if request.method == 'GET':
-            form.status.data = t.status.value
+            form.status.data = STATUS_TO_FORM[t.status]
             form.assigned_to.data = t.assigned_to_id or 0
             form.priority.data = t.priority
 
         if form.validate_on_submit():
             changes = []
+            old_assignee_id, old_status = t.assigned_to_id, t.status
 
             # Stato
-            if form.status.data != t.status.value:
+            new_status = STATUS_FROM_FORM.get(form.status.data, t.status)
+            if new_status != t.status:
                 old = t.status.value
-                if form.status.data in TicketStatus.__members__:
-                    t.status = TicketStatus[form.status.data]
-                else:
-                    t.status = TicketStatus(form.status.data)
+                t.status = new_status
                 changes.append(f"Stato: {old} → {t.status.value}")
 
             # Assegnatario
@@ -365,6 +590,7 @@ def create_app():
             if new_assignee_id != t.assigned_to_id:
                 old_name = t.assigned_to.name if t.assigned_to else "Nessuno"
                 new_name = db.session.get(User, new_assignee_id).name if new_assignee_id else "Nessuno"
+                notify_assignment(t, t.assigned_to_id, new_assignee_id, current_user)
                 t.assigned_to_id = new_assignee_id
                 changes.append(f"Assegnatario: {old_name} → {new_name}")
 
@@ -389,6 +615,10 @@ def create_app():
                 notes=notes
             )
 
+            # Priorità o stato cambiati: ricalcola la scadenza SLA (chiuso = nessuna scadenza)
+            apply_sla(t, sla.targets)
+            adjust_workload(old_assignee_id, old_status, t.assigned_to_id, t.status)
+
             t.updated_at = datetime.utcnow()
             db.session.add(t)
             db.session.add(act)
@@ -405,6 +635,102 @@ def create_app():
         )
         return render_template('ticket_detail.html', t=t, form=form, actions=actions)
 
+    # --------------------- UPLOAD A BLOCCHI ---------------------
+    # POST /uploads/chunked {filename, size, sha256} -> {upload_id, offset, chunk_size}
+    # PUT  /uploads/chunked/<id>?offset=N  (corpo = byte grezzi del blocco, al massimo chunk_size)
+    # GET  /uploads/chunked/<id>  -> {offset} per riprendere dopo un'interruzione
+    # POST /uploads/chunked/<id>/finalize {ticket_id}
+    def _upload_session(upload_id):
+        session = db.session.get(UploadSession, upload_id)
+        if not session or session.user_id != current_user.id:
+            return None
+        return session
+
+    @app.errorhandler(UploadError)
+    def upload_error(e):
+        payload = {'error': str(e)}
+        if e.offset is not None:
+            payload['offset'] = e.offset
+        return jsonify(payload), e.status
+
+    @app.errorhandler(RequestEntityTooLarge)
+    def request_too_large(e):
+        # Oltre MAX_CONTENT_LENGTH: per l'API a blocchi errore JSON come gli altri
+        if request.path.startswith('/uploads/chunked'):
+            return jsonify({'error': "Blocco troppo grande", 'chunk_size': _chunk_size()}), 413
+        return e
+
+    def _chunk_size():
+        limit = current_app.config.get('MAX_CONTENT_LENGTH')
+        chunk_size = current_app.config['UPLOAD_CHUNK_SIZE']
+        return min(chunk_size, limit) if limit else chunk_size
+
+    @app.route('/uploads/chunked', methods=['POST'])
+    @login_required
+    def upload_start():
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            raise UploadError("Richiesta JSON attesa")
+        filename = data.get('filename')
+        filename = secure_filename(filename) if isinstance(filename, str) else ''
+        if not filename:
+            raise UploadError("Nome file non valido")
+        size = data.get('size')
+        if not isinstance(size, int) or isinstance(size, bool):
+            raise UploadError("Dimensione non valida")
+        session = chunked_uploads.start(
+            current_app.config, current_user.id, filename, size, data.get('sha256')
+        )
+        return jsonify({'upload_id': session.id, 'offset': 0, 'chunk_size': _chunk_size()}), 201
+
+    @app.route('/uploads/chunked/<upload_id>', methods=['GET'])
+    @login_required
+    def upload_status(upload_id):
+        session = _upload_session(upload_id)
+        if not session:
+            raise UploadError("Upload non trovato", status=404)
+        return jsonify({'upload_id': session.id, 'offset': session.received, 'size': session.total_size})
+
+    @app.route('/uploads/chunked/<upload_id>', methods=['PUT'])
+    @login_required
+    def upload_chunk(upload_id):
+        session = db.session.query(UploadSession).filter_by(id=upload_id).with_for_update().first()
+        if not session or session.user_id != current_user.id:
+            raise UploadError("Upload non trovato", status=404)
+        offset = request.args.get('offset', type=int)
+        if offset is None:
+            raise UploadError("Parametro offset mancante")
+        if (request.content_length or 0) > _chunk_size():
+            raise UploadError("Blocco troppo grande", status=413, offset=session.received)
+        received = chunked_uploads.write_chunk(current_app.config, session, offset, request.stream)
+        return jsonify({'upload_id': session.id, 'offset': received})
+
+    @app.route('/uploads/chunked/<upload_id>/finalize', methods=['POST'])
+    @login_required
+    def upload_finalize(upload_id):
+        session = _upload_session(upload_id)
+        if not session:
+            raise UploadError("Upload non trovato", status=404)
+        data = request.get_json(silent=True) or {}
+        ticket_id = data.get('ticket_id')
+        if not isinstance(ticket_id, int) or isinstance(ticket_id, bool):
+            raise UploadError("ticket_id deve essere un intero")
+        t = db.session.get(Ticket, ticket_id)
+        if not t:
+            raise UploadError("Ticket non trovato", status=404)
+
+        filename = chunked_uploads.finalize(current_app.config, session)
+        t.attachment = filename
+        t.updated_at = datetime.utcnow()
+        db.session.add(TicketAction(
+            ticket_id=t.id,
+            user_id=current_user.id,
+            action=f"Allegato aggiornato: {filename}",
+            notes=""
+        ))
+        db.session.commit()
+        return jsonify({'ticket_id': t.id, 'attachment': filename})
+
     # --------------------- FILES ---------------------
     @app.route('/uploads/<path:filename>')
     @login_required
@@ -7,12 +7,7 @@ from flask_login import LoginManager
 from werkzeug.security import generate_password_hash
 
 from models import db, User  # assumes models.py defines SQLAlchemy db and User model
-
-
-def _coerce_bool(value: str, default: bool = False) -> bool:
-    if value is None:
-        return default
-    return str(value).strip().lower() in {"1", "true", "yes", "y", "on"}
+from provisioning import coerce_bool
 
 
 def _ensure_upload_folder(app: Flask) -> None:
@@ -66,7 +61,7 @@ def create_app():
 
     # -------- Base config
     app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "change-me-in-production")
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = _coerce_bool(
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = coerce_bool(
         os.getenv("SQLALCHEMY_TRACK_MODIFICATIONS", "false")
     )
 
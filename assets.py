@@ -0,0 +1,154 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import zlib
+
+from flask import current_app, request, send_from_directory, url_for
+
+# File statici da precomprimere in .gz all'avvio
+PRECOMPRESS_EXTENSIONS = {".css", ".js", ".svg", ".json", ".txt", ".map"}
+# Risposte dinamiche da comprimere al volo
+COMPRESS_MIMETYPES = {"text/html", "text/csv", "application/json"}
+
+
+def _file_digest(path):
+    digest = hashlib.md5()
+    with open(path, "rb") as fh:
+        for buf in iter(lambda: fh.read(64 * 1024), b""):
+            digest.update(buf)
+    return digest.hexdigest()[:12]
+
+
+def _gzip_stream(chunks, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = formato gzip
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class Assets:
+    """Fingerprinted static files and gzip for dynamic responses.
+
+    - asset_url(filename) in templates adds ?v=<content hash>; requests carrying
+      the current hash are served with a one-year immutable Cache-Control.
+    - Compressible static files get a .gz sibling at startup, served to clients
+      that accept gzip.
+    - HTML, CSV and JSON responses of at least COMPRESS_MIN_SIZE bytes are
+      gzipped; streamed responses are compressed chunk by chunk.
+    """
+
+    def __init__(self, app=None):
+        self.manifest = {}
+        self.gzipped = set()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("ASSET_MAX_AGE", 365 * 24 * 3600)
+        app.config.setdefault("COMPRESS_MIN_SIZE", 1024)
+        app.config.setdefault("COMPRESS_LEVEL", 6)
+
+        self._build(app)
+        app.extensions["assets"] = self
+        app.add_template_global(self.asset_url, "asset_url")
+        app.view_functions["static"] = self.send_static
+        app.after_request(self.compress_response)
+
+    def _build(self, app):
+        self.manifest, self.gzipped = {}, set()
+        root = app.static_folder
+        for dirpath, _, files in os.walk(root):
+            for name in files:
+                if name.endswith(".gz"):
+                    continue
+                path = os.path.join(dirpath, name)
+                rel = os.path.relpath(path, root).replace(os.sep, "/")
+                self.manifest[rel] = _file_digest(path)
+                if (
+                    os.path.splitext(name)[1] in PRECOMPRESS_EXTENSIONS
+                    and os.path.getsize(path) >= 1024
+                    and self._precompress(path)
+                ):
+                    self.gzipped.add(rel)
+
+    @staticmethod
+    def _precompress(path):
+        gz_path = path + ".gz"
+        try:
+            if not os.path.exists(gz_path) or os.path.getmtime(gz_path) < os.path.getmtime(path):
+                with open(path, "rb") as src, gzip.open(gz_path, "wb", compresslevel=9) as dst:
+                    dst.write(src.read())
+            return True
+        except OSError:
+            # File system di sola lettura: si serve il file non compresso
+            return False
+
+    def asset_url(self, filename):
+        if current_app.debug:
+            version = _file_digest(os.path.join(current_app.static_folder, filename))
+        else:
+            version = self.manifest.get(filename)
+        return url_for("static", filename=filename, v=version)
+
+    def send_static(self, filename):
+        root = current_app.static_folder
+        version = request.args.get("v")
+        immutable = version is not None and version == self.manifest.get(filename)
+        max_age = current_app.config["ASSET_MAX_AGE"] if immutable else None
+
+        if filename in self.gzipped and request.accept_encodings["gzip"]:
+            mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            response = send_from_directory(root, filename + ".gz", mimetype=mimetype, max_age=max_age)
+            response.headers["Content-Encoding"] = "gzip"
+        else:
+            response = send_from_directory(root, filename, max_age=max_age)
+        response.vary.add("Accept-Encoding")
+        if immutable:
+            response.cache_control.public = True
+            response.cache_control.immutable = True
+        return response
+
+    def compress_response(self, response):
+        if (
+            response.status_code != 200
+            or response.mimetype not in COMPRESS_MIMETYPES
+            or "Content-Encoding" in response.headers
+            or not request.accept_encodings["gzip"]
+        ):
+            return response
+
+        min_size = current_app.config["COMPRESS_MIN_SIZE"]
+        level = current_app.config["COMPRESS_LEVEL"]
+        if response.is_streamed:
+            if response.content_length is not None and response.content_length < min_size:
+                return response
+            source = response.response
+            response.direct_passthrough = False
+            response.response = _gzip_stream(source, level)
+            if hasattr(source, "close"):
+                response.call_on_close(source.close)
+        else:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            response.set_data(gzip.compress(data, compresslevel=level))
+
+        # Lunghezza e range dell'originale non valgono per il corpo compresso
+        # (per le risposte non in streaming werkzeug ricalcola Content-Length)
+        response.headers.pop("Content-Length", None)
+        response.headers.pop("Accept-Ranges", None)
+        # ETag distinto per variante, così una cache non serve gzip a chi non lo accetta
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-gzip", weak=weak)
+        response.headers["Content-Encoding"] = "gzip"
+        response.vary.add("Accept-Encoding")
+        return response
+
+
+assets = Assets()
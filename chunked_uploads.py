@@ -0,0 +1,117 @@
+import hashlib
+import os
+import secrets
+from datetime import datetime, timedelta
+
+from models import db, UploadSession
+
+COPY_BUFFER = 64 * 1024
+
+
+class UploadError(Exception):
+    """Upload rejected; status is the HTTP code to return."""
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+def part_path(config, session):
+    return os.path.join(config['UPLOAD_TMP_FOLDER'], f"{session.id}.part")
+
+
+def start(config, user_id, filename, total_size, sha256):
+    if total_size <= 0:
+        raise UploadError("Dimensione non valida")
+    if total_size > config['UPLOAD_MAX_SIZE']:
+        raise UploadError("File troppo grande", status=413)
+    if not isinstance(sha256, str):
+        raise UploadError("Checksum sha256 non valido")
+    sha256 = sha256.lower()
+    if len(sha256) != 64 or any(c not in "0123456789abcdef" for c in sha256):
+        raise UploadError("Checksum sha256 non valido")
+
+    purge_expired(config)
+    session = UploadSession(
+        id=secrets.token_hex(16),
+        user_id=user_id,
+        filename=filename,
+        total_size=total_size,
+        sha256=sha256,
+        received=0,
+    )
+    open(part_path(config, session), "wb").close()
+    db.session.add(session)
+    db.session.commit()
+    return session
+
+
+def write_chunk(config, session, offset, stream):
+    """Append the request body at `offset`, streaming it straight to disk."""
+    if offset != session.received:
+        raise UploadError("Offset non valido", status=409, offset=session.received)
+
+    remaining = session.total_size - offset
+    written = 0
+    with open(part_path(config, session), "r+b") as fh:
+        # Scarta eventuali byte di un blocco precedente interrotto a metà
+        fh.seek(offset)
+        fh.truncate()
+        while True:
+            buf = stream.read(COPY_BUFFER)
+            if not buf:
+                break
+            written += len(buf)
+            if written > remaining:
+                fh.truncate(offset)
+                raise UploadError("Il blocco supera la dimensione dichiarata", status=413, offset=offset)
+            fh.write(buf)
+
+    session.received = offset + written
+    db.session.commit()
+    return session.received
+
+
+def finalize(config, session):
+    """Verify size and checksum and move the file into UPLOAD_FOLDER.
+
+    The file is stored as "<upload id>_<name>", so it never replaces another
+    ticket's attachment. Returns the stored filename; the session row is
+    deleted in the caller's transaction so it commits with the ticket update.
+    """
+    path = part_path(config, session)
+    if session.received != session.total_size:
+        raise UploadError("Upload incompleto", status=409, offset=session.received)
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for buf in iter(lambda: fh.read(COPY_BUFFER), b""):
+            digest.update(buf)
+    if digest.hexdigest() != session.sha256:
+        discard(config, session)
+        db.session.commit()
+        raise UploadError("Checksum non corrispondente: ricaricare il file", status=422)
+
+    filename = f"{session.id}_{session.filename}"
+    target = os.path.join(config['UPLOAD_FOLDER'], filename)
+    if os.path.exists(target):
+        raise UploadError("Esiste già un file con questo nome", status=409)
+    os.replace(path, target)
+    db.session.delete(session)
+    return filename
+
+
+def discard(config, session):
+    try:
+        os.remove(part_path(config, session))
+    except FileNotFoundError:
+        pass
+    db.session.delete(session)
+
+
+def purge_expired(config):
+    """Drop sessions older than UPLOAD_SESSION_TTL_HOURS and their temp files."""
+    limit = datetime.utcnow() - timedelta(hours=config['UPLOAD_SESSION_TTL_HOURS'])
+    for session in db.session.query(UploadSession).filter(UploadSession.created_at < limit).all():
+        discard(config, session)
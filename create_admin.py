@@ -1,6 +1,5 @@
 from app import create_app
 from models import db, User
-from werkzeug.security import generate_password_hash
 
 ADMIN_NAME = "Admin"
 ADMIN_EMAIL = "admin@example.com"
@@ -13,7 +12,8 @@ with app.app_context():
     if existing:
         print(f"❌ Esiste già un utente con email {ADMIN_EMAIL}")
     else:
-        u = User(name=ADMIN_NAME, email=ADMIN_EMAIL.lower(), is_admin=True, password_hash=generate_password_hash(ADMIN_PASSWORD))
+        u = User(name=ADMIN_NAME, email=ADMIN_EMAIL.lower(), is_admin=True)
+        u.set_password(ADMIN_PASSWORD)
         db.session.add(u)
         db.session.commit()
         print("✅ Utente admin creato con successo!")
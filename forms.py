@@ -15,6 +15,10 @@ class RegisterForm(FlaskForm):
     is_admin = BooleanField('Admin?')
     submit = SubmitField('Crea utente')
 
+class ImportUsersForm(FlaskForm):
+    csv_file = FileField('File CSV (name,email[,password][,is_admin])', validators=[DataRequired()])
+    submit = SubmitField('Importa utenti')
+
 class TicketForm(FlaskForm):
     title = StringField('Titolo', validators=[DataRequired(), Length(min=3, max=200)])
     description = TextAreaField('Descrizione', validators=[DataRequired(), Length(min=5)])
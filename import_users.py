@@ -0,0 +1,45 @@
+import argparse
+import sys
+
+from sqlalchemy.exc import IntegrityError
+
+from app import create_app
+from models import db
+from provisioning import parse_users_csv, provision_users
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crea utenti in blocco da un file CSV (name,email[,password][,is_admin]).")
+    parser.add_argument("csv_file", help="percorso del file CSV")
+    parser.add_argument("--workers", type=int, default=None, help="processi per l'hashing (default: tutti i core)")
+    args = parser.parse_args()
+
+    with open(args.csv_file, encoding="utf-8-sig") as fh:
+        rows, errors = parse_users_csv(fh.read())
+
+    for err in errors:
+        print(f"⚠️  {err}", file=sys.stderr)
+
+    app = create_app()
+
+    with app.app_context():
+        try:
+            count, generated, skipped = provision_users(rows, workers=args.workers)
+        except IntegrityError:
+            db.session.rollback()
+            print("❌ Un utente del file è stato creato nel frattempo: nessun utente importato. "
+                  "Rilanciare l'import (gli utenti già esistenti verranno saltati).", file=sys.stderr)
+            sys.exit(1)
+
+    print(f"✅ Utenti creati: {count}")
+    if skipped:
+        print(f"❌ Già esistenti (saltati): {len(skipped)}")
+    if generated:
+        print("Password generate:")
+        for email, password in generated:
+            print(f"{email};{password}")
+
+
+# Il guard serve anche ai processi figli del pool di hashing (spawn su Windows/macOS)
+if __name__ == "__main__":
+    main()
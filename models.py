@@ -2,7 +2,8 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
 import enum
-from werkzeug.security import generate_password_hash, check_password_hash
+
+from passwords import hasher
 
 db = SQLAlchemy()
 
@@ -13,6 +14,12 @@ class TicketStatus(enum.Enum):
     CLOSED = "Chiuso"
 
 
+class SlaLevel(enum.IntEnum):
+    OK = 0
+    DUE_SOON = 1
+    BREACHED = 2
+
+
 # ---------------- USER ----------------
 class User(db.Model, UserMixin):
     __tablename__ = "users"  # Evita parola riservata "user"
@@ -23,15 +30,21 @@ class User(db.Model, UserMixin):
     password_hash = db.Column(db.String(255), nullable=False)
     is_admin = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Contatori denormalizzati dei ticket assegnati (vedi adjust_workload)
+    open_tickets_count = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    in_progress_tickets_count = db.Column(db.Integer, default=0, server_default="0", nullable=False)
 
     tickets_created = db.relationship("Ticket", backref="created_by", foreign_keys="Ticket.created_by_id")
     tickets_assigned = db.relationship("Ticket", backref="assigned_to", foreign_keys="Ticket.assigned_to_id")
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return hasher.needs_rehash(self.password_hash)
 
 
 # ---------------- TICKET ----------------
@@ -46,12 +59,22 @@ class Ticket(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     attachment = db.Column(db.String(255), nullable=True)
+    # Scadenza SLA (NULL se la priorità non ha SLA o il ticket è chiuso)
+    due_at = db.Column(db.DateTime, nullable=True)
+    sla_level = db.Column(db.Integer, default=int(SlaLevel.OK), server_default="0", nullable=False)
 
     created_by_id = db.Column(db.Integer, db.ForeignKey("users.id"))
     assigned_to_id = db.Column(db.Integer, db.ForeignKey("users.id"))
 
     actions = db.relationship("TicketAction", backref="ticket", lazy=True, cascade="all, delete-orphan")
 
+    # Lo scheduler SLA legge solo i ticket non ancora escalati con scadenza nel range
+    __table_args__ = (
+        db.Index("ix_tickets_sla_level_due_at", "sla_level", "due_at"),
+        # Inbox "I miei ticket": assegnatario + stato, ordinati per aggiornamento
+        db.Index("ix_tickets_assigned_status_updated", "assigned_to_id", "status", "updated_at"),
+    )
+
 
 # ---------------- ACTION ----------------
 class TicketAction(db.Model):
@@ -64,3 +87,117 @@ class TicketAction(db.Model):
     notes = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    user = db.relationship("User")
+
+
+# ---------------- OUTBOX ----------------
+class NotificationOutbox(db.Model):
+    """Notifiche scritte nella stessa transazione dell'azione, inviate dal worker."""
+    __tablename__ = "notification_outbox"
+
+    id = db.Column(db.Integer, primary_key=True)
+    recipient_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    ticket_id = db.Column(db.Integer, db.ForeignKey("tickets.id"), nullable=False)
+    message = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    # NULL dopo l'invio o dopo l'ultimo tentativo fallito: esce dalla coda
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.String(255), nullable=True)
+
+    recipient = db.relationship("User")
+    ticket = db.relationship("Ticket")
+
+    __table_args__ = (
+        db.Index("ix_notification_outbox_next_attempt_at", "next_attempt_at"),
+        db.Index("ix_notification_outbox_sent_at", "sent_at"),
+    )
+
+
+# ---------------- UPLOAD A BLOCCHI ----------------
+class UploadSession(db.Model):
+    __tablename__ = "upload_sessions"
+
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    sha256 = db.Column(db.String(64), nullable=False)
+    received = db.Column(db.BigInteger, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+# ---------------- WORKLOAD ----------------
+WORKLOAD_COUNTERS = {
+    TicketStatus.OPEN: User.open_tickets_count,
+    TicketStatus.IN_PROGRESS: User.in_progress_tickets_count,
+}
+
+
+def _bump(user_id, status, delta):
+    column = WORKLOAD_COUNTERS.get(status)
+    if user_id and column is not None:
+        db.session.query(User).filter(User.id == user_id).update({column: column + delta})
+
+
+def adjust_workload(old_assignee_id, old_status, new_assignee_id, new_status):
+    """Move a ticket between per-user counters in the current transaction.
+
+    Pass None as old values for a new ticket. Atomic UPDATEs, so concurrent
+    edits of different tickets do not lose increments.
+    """
+    if (old_assignee_id, old_status) == (new_assignee_id, new_status):
+        return
+    _bump(old_assignee_id, old_status, -1)
+    _bump(new_assignee_id, new_status, 1)
+
+
+def recompute_workload():
+    """Rebuild all counters from the tickets table with one aggregate query."""
+    db.session.query(User).update({
+        User.open_tickets_count: 0,
+        User.in_progress_tickets_count: 0,
+    })
+    rows = (
+        db.session.query(Ticket.assigned_to_id, Ticket.status, db.func.count(Ticket.id))
+        .filter(Ticket.assigned_to_id.isnot(None))
+        .filter(Ticket.status.in_(list(WORKLOAD_COUNTERS)))
+        .group_by(Ticket.assigned_to_id, Ticket.status)
+        .all()
+    )
+    for user_id, status, count in rows:
+        column = WORKLOAD_COUNTERS[status]
+        db.session.query(User).filter(User.id == user_id).update({column: count})
+    db.session.commit()
+
+
+# ---------------- SCHEMA ----------------
+def ensure_schema():
+    """Add columns and indexes introduced after a table was first created.
+
+    db.create_all() only creates missing tables; this covers the additive
+    changes (nullable columns or columns with a server default) on existing ones.
+    Returns the added columns as "table.column" strings.
+    """
+    added = []
+    engine = db.engine
+    inspector = db.inspect(engine)
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col.type.compile(dialect=engine.dialect)}"
+                if col.server_default is not None:
+                    ddl += f" DEFAULT {col.server_default.arg}"
+                if not col.nullable:
+                    ddl += " NOT NULL"
+                conn.execute(db.text(ddl))
+                added.append(f"{table.name}.{col.name}")
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+    return added
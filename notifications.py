@@ -0,0 +1,169 @@
+import smtplib
+from collections import defaultdict
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+from models import db, NotificationOutbox
+from workers import PeriodicWorker
+
+
+def enqueue(recipient_id, ticket, message, actor_id=None):
+    """Add a notification to the current transaction (nothing is sent here).
+
+    Call it before the commit that stores the TicketAction, so both are
+    written or neither is. Self-notifications are skipped.
+    """
+    if not recipient_id or recipient_id == actor_id:
+        return
+    db.session.add(NotificationOutbox(
+        recipient_id=recipient_id,
+        ticket_id=ticket.id,
+        message=message[:255],
+    ))
+
+
+def notify_assignment(ticket, old_assignee_id, new_assignee_id, actor):
+    label = f"#{ticket.id} {ticket.title}"
+    if new_assignee_id:
+        enqueue(new_assignee_id, ticket, f"{label}: assegnato a te da {actor.name}", actor.id)
+    if old_assignee_id and old_assignee_id != new_assignee_id:
+        enqueue(old_assignee_id, ticket, f"{label}: riassegnato da {actor.name}", actor.id)
+
+
+def _build_digest(config, recipient, items):
+    base_url = (config.get("APP_BASE_URL") or "").rstrip("/")
+    lines = [f"Ciao {recipient.name},", "", "aggiornamenti sui tuoi ticket:", ""]
+    for n in items:
+        line = f"- {n.message}"
+        if base_url:
+            line += f"  {base_url}/tickets/{n.ticket_id}"
+        lines.append(line)
+
+    msg = EmailMessage()
+    msg["From"] = config.get("MAIL_FROM", "ticketing@localhost")
+    msg["To"] = recipient.email
+    msg["Subject"] = (
+        f"[Ticketing] {items[0].message}" if len(items) == 1
+        else f"[Ticketing] {len(items)} aggiornamenti sui tuoi ticket"
+    )
+    msg.set_content("\n".join(lines))
+    return msg
+
+
+def _connect(config):
+    smtp = smtplib.SMTP(config["SMTP_HOST"], int(config.get("SMTP_PORT", 25)), timeout=30)
+    if config.get("SMTP_STARTTLS"):
+        smtp.starttls()
+    if config.get("SMTP_USER"):
+        smtp.login(config["SMTP_USER"], config.get("SMTP_PASSWORD", ""))
+    return smtp
+
+
+def deliver_pending(config, now=None):
+    """Send one batch of due notifications, one digest per recipient.
+
+    Failed recipients are retried with exponential backoff starting at
+    NOTIFY_BACKOFF_SECONDS, up to NOTIFY_MAX_ATTEMPTS attempts.
+    Returns (sent, failed) counted in digests.
+    """
+    now = now or datetime.utcnow()
+    batch_size = int(config.get("NOTIFY_BATCH_SIZE", 200))
+    max_attempts = int(config.get("NOTIFY_MAX_ATTEMPTS", 5))
+    backoff = float(config.get("NOTIFY_BACKOFF_SECONDS", 60))
+
+    pending = (
+        db.session.query(NotificationOutbox)
+        .filter(NotificationOutbox.next_attempt_at <= now)
+        .order_by(NotificationOutbox.next_attempt_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    if not pending:
+        return 0, 0
+
+    by_recipient = defaultdict(list)
+    for n in pending:
+        by_recipient[n.recipient_id].append(n)
+
+    def _fail(items, error):
+        for n in items:
+            n.attempts += 1
+            n.last_error = str(error)[:255]
+            n.next_attempt_at = (
+                None if n.attempts >= max_attempts
+                else now + timedelta(seconds=backoff * 2 ** (n.attempts - 1))
+            )
+
+    sent = failed = 0
+    try:
+        smtp = _connect(config)
+    except (OSError, smtplib.SMTPException) as e:
+        _fail(pending, e)
+        db.session.commit()
+        return 0, len(by_recipient)
+
+    try:
+        for items in by_recipient.values():
+            try:
+                smtp.send_message(_build_digest(config, items[0].recipient, items))
+            except smtplib.SMTPServerDisconnected as e:
+                # Connessione persa: il resto del batch riprova al prossimo giro
+                _fail(items, e)
+                failed += 1
+                break
+            except (OSError, smtplib.SMTPException) as e:
+                _fail(items, e)
+                failed += 1
+                continue
+            for n in items:
+                n.sent_at = now
+                n.next_attempt_at = None
+            sent += 1
+    finally:
+        try:
+            smtp.quit()
+        except (OSError, smtplib.SMTPException):
+            pass
+        db.session.commit()
+    return sent, failed
+
+
+def purge_sent(config, now=None):
+    """Delete notifications sent more than NOTIFY_RETENTION_DAYS ago."""
+    now = now or datetime.utcnow()
+    limit = now - timedelta(days=float(config.get("NOTIFY_RETENTION_DAYS", 30)))
+    deleted = (
+        db.session.query(NotificationOutbox)
+        .filter(NotificationOutbox.sent_at < limit)
+        .delete(synchronize_session=False)
+    )
+    db.session.commit()
+    return deleted
+
+
+class OutboxWorker(PeriodicWorker):
+    """Delivers the notification outbox every NOTIFY_INTERVAL seconds.
+
+    Sent notifications are kept for NOTIFY_RETENTION_DAYS, then deleted.
+    The thread starts only when SMTP_HOST is configured; until then
+    notifications stay queued in the outbox.
+    """
+
+    name = "outbox-worker"
+
+    def init_app(self, app):
+        app.extensions["outbox_worker"] = self
+        if app.config.get("SMTP_HOST"):
+            self.start(app, float(app.config.get("NOTIFY_INTERVAL", 30)))
+        else:
+            self.stop()
+
+    def run_once(self, app):
+        sent, failed = deliver_pending(app.config)
+        if sent or failed:
+            app.logger.info(f"Outbox: {sent} email inviate, {failed} fallite")
+        purge_sent(app.config)
+
+
+outbox = OutboxWorker()
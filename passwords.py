@@ -0,0 +1,81 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash operations are already queued."""
+
+
+class PasswordHasher:
+    """Password hashing with a configurable policy and a bounded worker pool.
+
+    Config keys (all optional):
+    - PASSWORD_HASH_METHOD: werkzeug method string, e.g. "scrypt",
+      "scrypt:16384:8:1" or "pbkdf2:sha256:260000"
+    - PASSWORD_HASH_WORKERS: hashes computed concurrently (default 2)
+    - PASSWORD_HASH_QUEUE: extra requests allowed to wait (default 16)
+    - PASSWORD_HASH_TIMEOUT: seconds to wait for a free slot (default 5)
+
+    hashlib releases the GIL while hashing, so a small thread pool is enough to
+    cap the CPU used by login bursts without blocking unrelated requests.
+    """
+
+    def __init__(self, app=None):
+        self.method = "scrypt"
+        self.workers = 2
+        self.queue = 16
+        self.timeout = 5.0
+        self._prefix = None
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.method = app.config.get("PASSWORD_HASH_METHOD", self.method)
+        self.workers = int(app.config.get("PASSWORD_HASH_WORKERS", self.workers))
+        self.queue = int(app.config.get("PASSWORD_HASH_QUEUE", self.queue))
+        self.timeout = float(app.config.get("PASSWORD_HASH_TIMEOUT", self.timeout))
+        with self._lock:
+            self._prefix = None
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = None
+            self._slots = None
+        app.extensions["password_hasher"] = self
+
+    def _run(self, fn, *args):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pwhash")
+                self._slots = threading.BoundedSemaphore(self.workers + self.queue)
+            executor, slots = self._executor, self._slots
+        if not slots.acquire(timeout=self.timeout):
+            raise PasswordHasherBusy()
+        try:
+            return executor.submit(fn, *args).result()
+        finally:
+            slots.release()
+
+    @property
+    def prefix(self):
+        """Full method string as stored in hashes (e.g. "scrypt:32768:8:1")."""
+        if self._prefix is None:
+            # werkzeug fills in default cost factors: read them back from a real hash
+            self._prefix = generate_password_hash("", self.method).split("$", 1)[0]
+        return self._prefix
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        return (pwhash or "").split("$", 1)[0] != self.prefix
+
+
+hasher = PasswordHasher()
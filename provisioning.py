@@ -0,0 +1,123 @@
+import csv
+import os
+import string
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from datetime import datetime
+from io import StringIO
+
+from werkzeug.security import generate_password_hash
+
+from models import db, User
+from passwords import hasher
+
+# Sotto questa soglia il costo di avvio dei processi supera il guadagno
+PARALLEL_THRESHOLD = 16
+INSERT_BATCH_SIZE = 500
+
+
+def _random_password(length=10):
+    alphabet = string.ascii_letters + string.digits
+    return ''.join(secrets.choice(alphabet) for _ in range(length))
+
+
+def coerce_bool(value, default=False):
+    if value is None:
+        return default
+    return str(value).strip().lower() in {"1", "true", "yes", "y", "si", "sì", "on"}
+
+
+def parse_users_csv(text):
+    """Read users from CSV text with columns name, email, password, is_admin.
+
+    Only name and email are required; the delimiter (',' or ';') is sniffed.
+    Returns (rows, errors) where errors is a list of human readable strings.
+    """
+    try:
+        dialect = csv.Sniffer().sniff(text[:2048], delimiters=',;')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.DictReader(StringIO(text), dialect=dialect)
+
+    rows, errors, seen = [], [], set()
+    for lineno, raw in enumerate(reader, start=2):
+        raw = {(k or '').strip().lower(): (v or '').strip() for k, v in raw.items()}
+        name = raw.get('name') or raw.get('nome')
+        email = (raw.get('email') or '').lower()
+        if not name or not email or '@' not in email:
+            errors.append(f"Riga {lineno}: nome o email mancanti/non validi")
+            continue
+        if email in seen:
+            errors.append(f"Riga {lineno}: email duplicata nel file ({email})")
+            continue
+        seen.add(email)
+        rows.append({
+            'name': name,
+            'email': email,
+            'password': raw.get('password') or None,
+            'is_admin': coerce_bool(raw.get('is_admin') or raw.get('admin')),
+        })
+    return rows, errors
+
+
+def hash_passwords(passwords, workers=None, parallel=True):
+    """Hash a list of passwords, spreading the work over all CPU cores.
+
+    With parallel=False (web requests) no processes are forked: each hash goes
+    through the bounded pool of passwords.hasher like a normal login.
+    """
+    passwords = list(passwords)
+    if not parallel:
+        return [hasher.hash(p) for p in passwords]
+    hash_one = partial(generate_password_hash, method=hasher.method)
+    if len(passwords) < PARALLEL_THRESHOLD:
+        return [hash_one(p) for p in passwords]
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(hash_one, passwords, chunksize=chunksize))
+
+
+def provision_users(rows, workers=None, parallel=True):
+    """Create users in bulk.
+
+    Emails already present in `users` are skipped with a single indexed lookup,
+    passwords are hashed in a process pool and rows are inserted in batches.
+    Returns (count, generated, skipped): the number of users created, the
+    (email, password) pairs for generated passwords and the skipped emails.
+    """
+    emails = [r['email'] for r in rows]
+    existing = set()
+    if emails:
+        existing = {
+            e for (e,) in db.session.query(User.email).filter(User.email.in_(emails))
+        }
+
+    todo = [r for r in rows if r['email'] not in existing]
+    skipped = [r['email'] for r in rows if r['email'] in existing]
+
+    generated = []
+    for r in todo:
+        if not r['password']:
+            r['password'] = _random_password()
+            generated.append((r['email'], r['password']))
+
+    hashes = hash_passwords([r['password'] for r in todo], workers=workers, parallel=parallel)
+
+    now = datetime.utcnow()
+    payload = [
+        {
+            'name': r['name'],
+            'email': r['email'],
+            'is_admin': r['is_admin'],
+            'password_hash': h,
+            'created_at': now,
+        }
+        for r, h in zip(todo, hashes)
+    ]
+    for start in range(0, len(payload), INSERT_BATCH_SIZE):
+        db.session.execute(db.insert(User), payload[start:start + INSERT_BATCH_SIZE])
+    db.session.commit()
+
+    return len(todo), generated, skipped
@@ -0,0 +1,11 @@
+import os
+
+from app import create_app
+from sla import DEFAULT_SLA_HOURS, parse_sla_hours, recompute_due_dates
+
+app = create_app()
+
+with app.app_context():
+    targets = parse_sla_hours(os.getenv('SLA_HOURS', DEFAULT_SLA_HOURS))
+    changed = recompute_due_dates(targets)
+    print(f"✅ Scadenze SLA ricalcolate: {changed} ticket aggiornati.")
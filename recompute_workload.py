@@ -0,0 +1,10 @@
+from app import create_app
+from models import db, User, recompute_workload
+
+app = create_app()
+
+with app.app_context():
+    recompute_workload()
+    print("✅ Contatori dei ticket assegnati ricalcolati.")
+    for u in db.session.query(User).order_by(User.name).all():
+        print(f"{u.name} ({u.email}): {u.open_tickets_count} aperti, {u.in_progress_tickets_count} in lavorazione")
@@ -0,0 +1,157 @@
+from datetime import datetime, timedelta
+
+from models import db, User, Ticket, TicketAction, TicketStatus, SlaLevel
+from workers import PeriodicWorker
+
+DEFAULT_SLA_HOURS = "CRITICA=4,ALTA=8"
+
+
+def parse_sla_hours(value):
+    """Parse "CRITICA=4,ALTA=8" into {"CRITICA": 4.0, "ALTA": 8.0}."""
+    targets = {}
+    for item in (value or "").split(","):
+        if "=" not in item:
+            continue
+        priority, hours = item.split("=", 1)
+        targets[priority.strip().upper()] = float(hours)
+    return targets
+
+
+def compute_due_at(t, targets):
+    if t.status == TicketStatus.CLOSED:
+        return None
+    hours = targets.get((t.priority or "").upper())
+    if hours is None:
+        return None
+    return (t.created_at or datetime.utcnow()) + timedelta(hours=hours)
+
+
+def apply_sla(t, targets):
+    """Recompute the ticket deadline; a new deadline restarts the escalation."""
+    due_at = compute_due_at(t, targets)
+    if due_at != t.due_at:
+        t.due_at = due_at
+        t.sla_level = int(SlaLevel.OK)
+
+
+def recompute_due_dates(targets, batch_size=500):
+    """Recompute the deadline of every non-closed ticket.
+
+    Used to backfill due_at when the column is added and after SLA_HOURS
+    changes. Returns the number of tickets whose deadline changed.
+    """
+    changed = 0
+    q = (
+        db.session.query(Ticket)
+        .filter(Ticket.status != TicketStatus.CLOSED)
+        .order_by(Ticket.id)
+    )
+    for t in q.yield_per(batch_size):
+        due_at = t.due_at
+        apply_sla(t, targets)
+        if t.due_at != due_at:
+            changed += 1
+    db.session.commit()
+    return changed
+
+
+def _system_user_id():
+    row = (
+        db.session.query(User.id)
+        .filter(User.is_admin.is_(True))
+        .order_by(User.id)
+        .first()
+    )
+    return row[0] if row else None
+
+
+def _escalate_batch(query, level, label, user_id, batch_size):
+    tickets = (
+        query.order_by(Ticket.due_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for t in tickets:
+        t.sla_level = int(level)
+        db.session.add(TicketAction(
+            ticket_id=t.id,
+            user_id=user_id,
+            action=f"ESCALATION SLA: {label}",
+            notes=f"Priorità {t.priority}, scadenza {t.due_at.strftime('%d/%m/%Y %H:%M')}"
+        ))
+    db.session.commit()
+    return len(tickets)
+
+
+def escalate_due(warn_minutes=60, batch_size=200, now=None):
+    """Flag due-soon and overdue tickets, batch_size rows per transaction.
+
+    Both scans are range reads on (sla_level, due_at): closed tickets have no
+    due_at and escalated ones have a higher level, so the cost follows the
+    number of tickets changing state, not the size of the table.
+    Returns (due_soon, breached).
+    """
+    now = now or datetime.utcnow()
+    user_id = _system_user_id()
+    if user_id is None:
+        return 0, 0
+
+    breached = 0
+    while True:
+        q = (
+            db.session.query(Ticket)
+            .filter(Ticket.sla_level.in_([int(SlaLevel.OK), int(SlaLevel.DUE_SOON)]))
+            .filter(Ticket.due_at <= now)
+        )
+        n = _escalate_batch(q, SlaLevel.BREACHED, "scaduto", user_id, batch_size)
+        breached += n
+        if n < batch_size:
+            break
+
+    due_soon = 0
+    while True:
+        q = (
+            db.session.query(Ticket)
+            .filter(Ticket.sla_level == int(SlaLevel.OK))
+            .filter(Ticket.due_at > now, Ticket.due_at <= now + timedelta(minutes=warn_minutes))
+        )
+        n = _escalate_batch(q, SlaLevel.DUE_SOON, "in scadenza", user_id, batch_size)
+        due_soon += n
+        if n < batch_size:
+            break
+
+    return due_soon, breached
+
+
+class SlaScheduler(PeriodicWorker):
+    """Runs escalate_due() every SLA_SCAN_INTERVAL seconds in a daemon thread.
+
+    Config keys: SLA_HOURS, SLA_WARN_MINUTES, SLA_SCAN_INTERVAL,
+    SLA_BATCH_SIZE, SLA_SCHEDULER (set to False to disable the thread).
+    """
+
+    name = "sla-scheduler"
+
+    def __init__(self, app=None):
+        self.targets = parse_sla_hours(DEFAULT_SLA_HOURS)
+        super().__init__(app)
+
+    def init_app(self, app):
+        self.targets = parse_sla_hours(app.config.get("SLA_HOURS", DEFAULT_SLA_HOURS))
+        app.extensions["sla_scheduler"] = self
+        if app.config.get("SLA_SCHEDULER", True):
+            self.start(app, float(app.config.get("SLA_SCAN_INTERVAL", 60)))
+        else:
+            self.stop()
+
+    def run_once(self, app):
+        due_soon, breached = escalate_due(
+            warn_minutes=float(app.config.get("SLA_WARN_MINUTES", 60)),
+            batch_size=int(app.config.get("SLA_BATCH_SIZE", 200)),
+        )
+        if due_soon or breached:
+            app.logger.info(f"SLA: {due_soon} in scadenza, {breached} scaduti")
+
+
+sla = SlaScheduler()
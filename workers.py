@@ -0,0 +1,49 @@
+import threading
+
+from models import db
+
+
+class PeriodicWorker:
+    """Base for extensions that run a job every few seconds in a daemon thread.
+
+    Subclasses set `name`, implement run_once(app) and call start(app, interval)
+    from init_app. start() replaces the running thread, so the job always runs
+    against the app passed to the last init_app. Each pass gets its own app
+    context; errors are logged and rolled back and the loop keeps going.
+    """
+
+    name = "periodic-worker"
+
+    def __init__(self, app=None):
+        self._thread = None
+        self._stop = None
+        if app is not None:
+            self.init_app(app)
+
+    def start(self, app, interval):
+        self.stop()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(app, interval, self._stop), name=self.name, daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Let the running thread, if any, exit after its current pass."""
+        if self._stop is not None:
+            self._stop.set()
+        self._thread = self._stop = None
+
+    def run_once(self, app):
+        raise NotImplementedError
+
+    def _run(self, app, interval, stop):
+        while not stop.wait(interval):
+            with app.app_context():
+                try:
+                    self.run_once(app)
+                except Exception:
+                    db.session.rollback()
+                    app.logger.exception(f"{self.name} failed")
+                finally:
+                    db.session.remove()